@@ -21,3 +21,16 @@ def get_funding_rate(symbol):
         return funding['fundingRate'] * 100  # в %
     except:
         return 0.0
+
+def get_funding_history(symbol, limit=500):
+    """История funding rate в % (Series по времени) – для бэктестов."""
+    try:
+        ex = ccxt.bingx({'enableRateLimit': True})
+        rows = ex.fetch_funding_rate_history(symbol, limit=limit)
+        s = pd.Series(
+            [r['fundingRate'] * 100 for r in rows],
+            index=pd.to_datetime([r['timestamp'] for r in rows], unit='ms'),
+        )
+        return s.sort_index()
+    except:
+        return None
@@ -2,6 +2,7 @@
 import os
 import pickle
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 from tensorflow.keras.models import Sequential
 from tensorflow.keras.layers import LSTM, Dense, Dropout
 from tensorflow.keras.optimizers import Adam
@@ -49,13 +50,19 @@ class LSTMPredictor:
             raise ValueError("Данные содержат только один класс")
         return np.array(X), y
 
-    def train(self, df, epochs=5):
-        data = self.prepare_features(df.tail(400))
+    def training_sequences(self, df, bars_back=400):
+        data = self.prepare_features(df.tail(bars_back))
         X, y = self.create_sequences(data)
-        X = X.reshape((X.shape[0], X.shape[1], 5))
+        return X.reshape((X.shape[0], X.shape[1], 5)), y
+
+    def fit_sequences(self, X, y, epochs=5):
         self.model.fit(X, y, epochs=epochs, batch_size=32, verbose=0)
         self.is_trained = True
 
+    def train(self, df, epochs=5, bars_back=400):
+        X, y = self.training_sequences(df, bars_back)
+        self.fit_sequences(X, y, epochs=epochs)
+
     def predict_proba(self, df):
         data = self.prepare_features(df.tail(self.lookback + 10))
         if len(data) < self.lookback:
@@ -63,20 +70,46 @@ class LSTMPredictor:
         seq = data[-self.lookback:].reshape(1, self.lookback, 5)
         return float(self.model.predict(seq, verbose=0)[0, 0])
 
+    def prediction_sequences(self, df):
+        """
+        Входы predict_proba(df.iloc[:t + 1]) для всех баров сразу, включая min-max
+        нормировку по окну lookback + 10. Возвращает (seqs, first), где seqs[i] – бар first + i.
+        """
+        features = df[['open', 'high', 'low', 'close', 'volume']].values.astype(float)
+        window = self.lookback + 10
+        if len(features) < window:
+            return np.empty((0, self.lookback, 5)), len(features)
+        windows = sliding_window_view(features, window, axis=0).transpose(0, 2, 1)
+        lo = windows.min(axis=1, keepdims=True)
+        rng = windows.max(axis=1, keepdims=True) - lo
+        rng[rng == 0] = 1.0  # как MinMaxScaler для константного признака
+        return ((windows - lo) / rng)[:, -self.lookback:], window - 1
+
+    def predict_sequences(self, seqs):
+        return self.model.predict(seqs, batch_size=256, verbose=0)[:, 0]
+
+    def predict_proba_batch(self, df):
+        """Вероятность для каждого бара df одним батчем; бары без полного окна – NaN."""
+        probs = np.full(len(df), np.nan)
+        seqs, first = self.prediction_sequences(df)
+        if len(seqs):
+            probs[first:] = self.predict_sequences(seqs)
+        return probs
+
 
 class LSTMEnsemble:
-    def __init__(self):
-        self.model1 = LSTMPredictor(lookback=60)
-        self.model2 = LSTMPredictor(lookback=90)
+    def __init__(self, lookbacks=(60, 90)):
+        self.model1 = LSTMPredictor(lookback=lookbacks[0])
+        self.model2 = LSTMPredictor(lookback=lookbacks[1])
         self.is_trained = False
 
     def build_models(self):
-        self.model1.build_model((60, 5))
-        self.model2.build_model((90, 5))
+        self.model1.build_model((self.model1.lookback, 5))
+        self.model2.build_model((self.model2.lookback, 5))
 
-    def train(self, df, epochs=5):
-        self.model1.train(df, epochs=epochs)
-        self.model2.train(df, epochs=epochs)
+    def train(self, df, epochs=5, bars_back=400):
+        self.model1.train(df, epochs=epochs, bars_back=bars_back)
+        self.model2.train(df, epochs=epochs, bars_back=bars_back)
         self.is_trained = True
 
     def predict_proba(self, df):
@@ -84,6 +117,9 @@ class LSTMEnsemble:
         p2 = self.model2.predict_proba(df)
         return (p1 + p2) / 2.0  # Простое усреднение
 
+    def predict_proba_batch(self, df):
+        return (self.model1.predict_proba_batch(df) + self.model2.predict_proba_batch(df)) / 2.0
+
     def save(self, path):
         os.makedirs(os.path.dirname(path), exist_ok=True)
         # Сохраняем с расширением .weights.h5 (требование TF 2.19+)
@@ -8,20 +8,27 @@ Quantum Edge AI Bot (DEMO)
 - полные информативные логи
 """
 
-import shutil
-import subprocess
 import os
 import time
 import threading
 import logging
 import signal
+from concurrent.futures import ThreadPoolExecutor
 
 import ccxt
+import numpy as np
 from flask import Flask
 
-from trainer import load_model
+from weight_sync import WeightSync, open_remote
+from model_reloader import ModelReloader
 from data_fetcher import get_bars, get_funding_rate
-from strategy import calculate_strategy_signals, get_market_regime
+from strategy import (
+    calculate_strategy_signals,
+    get_market_regime,
+    calculate_panel_signals,
+    get_market_regime_panel,
+    panel_symbol_frame,
+)
 from risk_manager import (
     calculate_position_size,
     calculate_stop_loss,
@@ -34,8 +41,20 @@ RISK_PCT = float(os.getenv("RISK_PCT", "1.0"))
 MIN_VOL = float(os.getenv("MIN_VOLATILITY", "0.005"))
 RR_RATIO = float(os.getenv("RISK_REWARD_RATIO", "2.5"))
 MIN_VOLUME_USD = float(os.getenv("MIN_VOLUME_USD", "50000"))
+# Пороги входа (подбираются scripts/optimize_thresholds.py)
+LONG_SCORE_MIN = int(os.getenv("LONG_SCORE_MIN", "5"))
+TREND_SCORE_MIN = int(os.getenv("TREND_SCORE_MIN", "3"))
+PROB_LONG = float(os.getenv("PROB_LONG", "0.60"))
+SHORT_LONG_MAX = int(os.getenv("SHORT_LONG_SCORE_MAX", "2"))
+SHORT_TREND_MAX = int(os.getenv("SHORT_TREND_SCORE_MAX", "1"))
+PROB_SHORT = float(os.getenv("PROB_SHORT", "0.25"))
+FUNDING_MAX = float(os.getenv("FUNDING_MAX", "0.05"))
 ORDER_TO = int(os.getenv("ORDER_TIMEOUT", "120"))
 PORT = int(os.getenv("PORT", "10000"))
+LOAD_WORKERS = int(os.getenv("MODEL_LOAD_WORKERS", "4"))
+WEIGHTS_REMOTE = os.getenv(
+    "WEIGHTS_REMOTE", "https://github.com/soul-code-tech/quantum-edge-ai-bot.git"
+)
 
 SYMBOLS = [
     "BTC/USDT:USDT",
@@ -64,19 +83,28 @@ active_pos: dict = {}  # symbol -> {side, size, created, order_id}
 last_df: dict = {}
 last_bar_time: dict = {}
 
+BOOT_T0 = time.time()
+boot: dict = {"synced": False, "first_decision": None}
+
 _exchange = None
+_exchange_lock = threading.Lock()
 app = Flask(__name__)
 
+weight_sync = WeightSync(open_remote(WEIGHTS_REMOTE, branch="weights"))
+reloader = ModelReloader(SYMBOLS, sync=weight_sync)
+
 
 def get_exchange():
     global _exchange
-    if _exchange is None:
-        _exchange = ccxt.bingx({
-            "apiKey": os.getenv("BINGX_API_KEY"),
-            "secret": os.getenv("BINGX_SECRET_KEY"),
-            "options": {"defaultType": "swap"},
-            "enableRateLimit": True,
-        })
+    # warm_exchange и trade_loop стартуют одновременно – клиент должен быть один
+    with _exchange_lock:
+        if _exchange is None:
+            _exchange = ccxt.bingx({
+                "apiKey": os.getenv("BINGX_API_KEY"),
+                "secret": os.getenv("BINGX_SECRET_KEY"),
+                "options": {"defaultType": "swap"},
+                "enableRateLimit": True,
+            })
     return _exchange
 
 
@@ -203,17 +231,34 @@ def refresh_sl_tp(symbol: str, side: str):
         logger.warning(f"⚠️  Не удалось обновить SL/TP {symbol}: {e}")
 
 
-def one_symbol_flow(symbol: str, balance: float):
+def compute_signals(symbols):
+    """Сигналы стратегии и режим рынка сразу для всех символов цикла (панельный режим)."""
+    frames = {}
+    for symbol in symbols:
+        model = models.get(symbol)
+        if model is None or not model.is_trained:
+            continue
+        df = get_cached_bars(symbol, "1h", 200)
+        if df is not None and len(df) >= 100:
+            frames[symbol] = df
+    if not frames:
+        return {}, {}
+    # float64 – значения совпадают с calculate_strategy_signals бит в бит
+    panel = calculate_panel_signals(frames, 60, dtype=np.float64)
+    return {s: panel_symbol_frame(panel, s) for s in frames}, get_market_regime_panel(panel)
+
+
+def one_symbol_flow(symbol: str, balance: float, df=None, regime=None):
     model = models.get(symbol)
     if model is None or not model.is_trained:
         return
 
-    df = get_cached_bars(symbol, "1h", 200)
-    if df is None or len(df) < 100:
-        return
-
-    df = calculate_strategy_signals(df, 60)
-    regime = get_market_regime(df)
+    if df is None:
+        df = get_cached_bars(symbol, "1h", 200)
+        if df is None or len(df) < 100:
+            return
+        df = calculate_strategy_signals(df, 60)
+        regime = get_market_regime(df)
     funding = get_funding_rate(symbol)
     volatility = df["volatility"].iloc[-1] if "volatility" in df else 0.0
     volume_usd = df["volume"].iloc[-1] * df["close"].iloc[-1]
@@ -221,9 +266,13 @@ def one_symbol_flow(symbol: str, balance: float):
     long_score = int(df["long_score"].iloc[-1])
     trend_score = int(df["trend_score"].iloc[-1])
     prob = float(model.predict_proba(df))
+    if boot["first_decision"] is None:
+        boot["first_decision"] = time.time() - BOOT_T0
+        logger.info(f"⏱️  Время до первого решения: {boot['first_decision']:.1f}s ({symbol})")
 
     logger.info(
-        f"🔍 {symbol} | long={long_score}/5 trend={trend_score}/4 "
+        f"🔍 {symbol} | model={reloader.versions.get(symbol)} "
+        f"long={long_score}/5 trend={trend_score}/4 "
         f"prob={prob:.3f} funding={funding:.3f}% vol={volatility:.4f} "
         f"volume={volume_usd:.0f}$ regime={regime}"
     )
@@ -233,10 +282,10 @@ def one_symbol_flow(symbol: str, balance: float):
         return
 
     if (
-        long_score >= 5
-        and trend_score >= 3
-        and prob > 0.60
-        and funding < 0.05
+        long_score >= LONG_SCORE_MIN
+        and trend_score >= TREND_SCORE_MIN
+        and prob > PROB_LONG
+        and funding < FUNDING_MAX
         and volatility > MIN_VOL
         and regime == "trending_up"
     ):
@@ -262,10 +311,10 @@ def one_symbol_flow(symbol: str, balance: float):
                 active_pos.pop(symbol, None)
 
     elif (
-        long_score <= 2
-        and trend_score <= 1
-        and prob < 0.25
-        and funding > -0.05
+        long_score <= SHORT_LONG_MAX
+        and trend_score <= SHORT_TREND_MAX
+        and prob < PROB_SHORT
+        and funding > -FUNDING_MAX
         and volatility > MIN_VOL
         and regime == "trending_down"
     ):
@@ -292,14 +341,14 @@ def one_symbol_flow(symbol: str, balance: float):
 
     else:
         reasons = []
-        if long_score < 5:
-            reasons.append("long<5")
-        if trend_score < 3:
-            reasons.append("trend<3")
-        if prob <= 0.60:
-            reasons.append("prob≤0.60")
-        if funding >= 0.05:
-            reasons.append("funding≥0.05")
+        if long_score < LONG_SCORE_MIN:
+            reasons.append(f"long<{LONG_SCORE_MIN}")
+        if trend_score < TREND_SCORE_MIN:
+            reasons.append(f"trend<{TREND_SCORE_MIN}")
+        if prob <= PROB_LONG:
+            reasons.append(f"prob≤{PROB_LONG:.2f}")
+        if funding >= FUNDING_MAX:
+            reasons.append(f"funding≥{FUNDING_MAX}")
         if volatility <= MIN_VOL:
             reasons.append("low_vol")
         if regime not in {"trending_up", "trending_down"}:
@@ -309,29 +358,97 @@ def one_symbol_flow(symbol: str, balance: float):
 
 def trade_loop():
     while True:
+        # Новые модели подменяются только здесь – между циклами
+        reloader.apply(models)
         balance = get_balance()
         logger.info(
             f"💼 Баланс={human_float(balance)} USDT  "
             f"Открыто={len(active_pos)}/{MAX_POS}"
         )
 
-        for symbol in SYMBOLS:
+        # Все слоты заняты – цикл сразу выйдет, панель не нужна
+        # (пересчёт внутри цикла стоит после той же проверки)
+        if len(active_pos) >= MAX_POS:
+            signals, regimes = {}, {}
+        else:
+            signals, regimes = compute_signals([s for s in SYMBOLS if s not in active_pos])
+        computed_at = time.time()
+        for i, symbol in enumerate(SYMBOLS):
             if len(active_pos) >= MAX_POS:
                 break
             if symbol in active_pos:
                 continue
-            one_symbol_flow(symbol, balance)
+            # Вход по предыдущему символу мог держать цикл до ORDER_TIMEOUT в await_fill –
+            # панель старше кеша баров пересчитываем для оставшихся символов
+            if time.time() - computed_at > 60:
+                rest = [s for s in SYMBOLS[i:] if s not in active_pos]
+                signals, regimes = compute_signals(rest)
+                computed_at = time.time()
+            one_symbol_flow(symbol, balance, signals.get(symbol), regimes.get(symbol))
 
-        time.sleep(60)
+        # Готовая модель будит цикл сразу – символ начинает торговать, не дожидаясь остальных
+        reloader.wait(60)
 
 
-def init_models():
-    for s in SYMBOLS:
-        if (model := load_model(s)) and model.is_trained:
-            models[s] = model
-            logger.info(f"✅ Модель {s} загружена")
-        else:
-            logger.warning(f"⚠️  Модель {s} не найдена / не обучена")
+def load_one_model(symbol: str):
+    t0 = time.time()
+    try:
+        model, version = reloader.load(symbol)
+    except Exception as e:
+        # битые веса одного символа не должны ронять загрузку остальных
+        logger.error(f"❌ Модель {symbol} не загрузилась: {e}")
+        return
+    if model is None:
+        logger.warning(f"⚠️  Модель {symbol} не найдена / не обучена")
+        return
+    reloader.stage(symbol, model, version, t0)
+    logger.info(f"✅ Модель {symbol} загружена (версия {version}) за {time.time() - t0:.2f}s")
+
+
+def init_models(symbols=SYMBOLS):
+    # Модели грузятся параллельно и по одной попадают в торговый цикл через reloader
+    with ThreadPoolExecutor(max_workers=LOAD_WORKERS) as pool:
+        list(pool.map(load_one_model, symbols))
+
+
+def warm_exchange():
+    try:
+        get_exchange().load_markets()
+    except Exception as e:
+        logger.warning(f"⚠️  Рынки не загружены заранее: {e}")
+
+
+def sync_weights():
+    # Качаем только артефакты, чей sha256 изменился с прошлого запуска
+    try:
+        changed = weight_sync.pull()
+        logger.info(f"🔄 Веса синхронизированы: обновлено {len(changed)} файлов")
+    except Exception as e:
+        logger.error(f"❌ Не удалось синхронизировать веса: {e}")
+    boot["synced"] = True
+
+
+def startup():
+    # Рынки биржи и веса подтягиваются параллельно с загрузкой моделей с диска
+    threading.Thread(target=warm_exchange, daemon=True).start()
+    sync = threading.Thread(target=sync_weights, daemon=True, name="weight-sync")
+    sync.start()
+
+    try:
+        init_models()
+        logger.info(
+            f"⏱️  Время до готовности: {time.time() - BOOT_T0:.1f}s "
+            f"(моделей {len(reloader.loaded_symbols())}/{len(SYMBOLS)})"
+        )
+        # Что изменилось после синхронизации – догружаем тем же пулом
+        sync.join()
+        updated = reloader.pending()
+        if updated:
+            init_models(updated)
+            logger.info(f"🔄 После синхронизации перезагружено моделей: {len(updated)}")
+    finally:
+        # reloader догрузит модели, которые не поднялись при старте
+        reloader.start()
 
 
 @app.route("/health")
@@ -339,6 +456,23 @@ def health():
     return {"status": "ok", "positions": len(active_pos), "balance": get_balance()}
 
 
+@app.route("/live")
+def live():
+    return {"status": "ok", "uptime": round(time.time() - BOOT_T0, 1)}
+
+
+@app.route("/ready")
+def ready():
+    # Считаем по текущему состоянию: модели, догруженные reloader'ом позже, тоже в счёт
+    loaded = len(reloader.loaded_symbols())
+    body = {
+        "ready": loaded > 0,
+        "synced": boot["synced"],
+        "models": f"{loaded}/{len(SYMBOLS)}",
+    }
+    return body, 200 if loaded > 0 else 503
+
+
 def shutdown(signum, frame):
     logger.info("🛑 SIGTERM/SIGINT – отмена всех ордеров...")
     try:
@@ -359,30 +493,7 @@ if __name__ == "__main__":
         MAX_POS, RISK_PCT, MIN_VOL * 100, int(MIN_VOLUME_USD),
     )
    
-    # ---------- Подтягиваем веса ----------
-    target_file = "weights/BTCUSDT.pkl"
-    if not os.path.exists(target_file):
-        logger.info("🔄 Клонирую веса из ветки weights...")
-        try:
-            subprocess.run([
-                "git", "clone", "--branch", "weights", "--depth", "1",
-                "https://github.com/soul-code-tech/quantum-edge-ai-bot.git",
-                "weights_tmp"
-            ], check=True)
-            # копируем ВСЕ файлы из weights_tmp/ в weights/
-            os.makedirs("weights", exist_ok=True)
-            for fname in os.listdir("weights_tmp"):
-                if fname.endswith((".pkl", ".weights.h5")):
-                    src = os.path.join("weights_tmp", fname)
-                    dst = os.path.join("weights", fname)
-                    shutil.move(src, dst)
-            subprocess.run(["rm", "-rf", "weights_tmp"], check=False)
-        except subprocess.CalledProcessError as e:
-            logger.error(f"❌ Не удалось клонировать веса: {e}")
-    # -------------------------------------
-
-    init_models()
-
-    init_models()  # ← вызываем ОДИН раз
+    # Flask стартует сразу: /live отвечает с первой секунды, /ready – после загрузки моделей
+    threading.Thread(target=startup, daemon=True).start()
     threading.Thread(target=trade_loop, daemon=True).start()
     app.run(host="0.0.0.0", port=PORT, debug=False)
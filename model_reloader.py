@@ -0,0 +1,142 @@
+# model_reloader.py
+"""
+Горячая перезагрузка моделей без рестарта бота.
+
+Фоновый поток раз в RELOAD_SEC подтягивает веса (если задан WeightSync),
+сравнивает sha256 артефактов каждого символа с загруженной версией и
+грузит изменившиеся ансамбли вне торгового потока. Готовые модели
+складываются в staged и попадают в models только через apply(),
+который торговый цикл вызывает между проходами по символам.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+
+from trainer import load_model, model_path
+from weight_sync import MANIFEST, file_sha256, read_manifest
+
+RELOAD_SEC = int(os.getenv("MODEL_RELOAD_SEC", "300"))
+
+logger = logging.getLogger("main")
+
+
+def artifact_names(symbol):
+    pkl = os.path.basename(model_path(symbol))
+    return [
+        pkl,
+        pkl.replace(".pkl", ".m1.weights.h5"),
+        pkl.replace(".pkl", ".m2.weights.h5"),
+    ]
+
+
+class ModelReloader:
+    def __init__(self, symbols, sync=None, interval=RELOAD_SEC):
+        self.symbols = symbols
+        self.sync = sync
+        self.interval = interval
+        self.versions = {}  # symbol -> версия модели, которая сейчас торгует
+        self.staged = {}    # symbol -> (model, version, t_detected), ждут apply()
+        self.lock = threading.Lock()
+        self.staged_event = threading.Event()
+
+    def fingerprint(self, symbol):
+        """Версия артефактов символа: короткий хеш от sha256 трёх файлов."""
+        weights_dir = os.path.dirname(model_path(symbol))
+        manifest = read_manifest(os.path.join(weights_dir, MANIFEST)) or {}
+        listed = manifest.get("artifacts", {})
+        h = hashlib.sha256()
+        for name in artifact_names(symbol):
+            if name in listed:
+                h.update(listed[name]["sha256"].encode())
+                continue
+            # артефакт вне манифеста (локальное обучение) – хешируем сам файл
+            path = os.path.join(weights_dir, name)
+            if not os.path.exists(path):
+                return None
+            h.update(file_sha256(path).encode())
+        return h.hexdigest()[:8]
+
+    def load(self, symbol):
+        """Загружает ансамбль символа. Возвращает (model, version) или (None, None)."""
+        version = self.fingerprint(symbol)
+        if version is None:
+            return None, None
+        model = load_model(symbol)
+        if model is None or not model.is_trained:
+            return None, None
+        return model, version
+
+    def known_version(self, symbol):
+        """Версия, ожидающая apply(), иначе та, что сейчас торгует."""
+        with self.lock:
+            staged = self.staged.get(symbol)
+            return staged[1] if staged else self.versions.get(symbol)
+
+    def pending(self):
+        """Символы, чьи артефакты на диске отличаются от загруженной версии."""
+        return [
+            symbol for symbol in self.symbols
+            if self.fingerprint(symbol) not in (None, self.known_version(symbol))
+        ]
+
+    def poll(self):
+        # Задержка перезагрузки считается с начала опроса: в неё входит скачивание весов
+        t0 = time.time()
+        if self.sync is not None:
+            self.sync.pull()
+        for symbol in self.pending():
+            known = self.known_version(symbol)
+            model, version = self.load(symbol)
+            if model is None:
+                logger.warning(f"⚠️  Перезагрузка {symbol}: модель не загрузилась")
+                continue
+            self.stage(symbol, model, version, t0)
+            logger.info(
+                f"📥 Модель {symbol} {known} → {version} загружена "
+                f"за {time.time() - t0:.2f}s"
+            )
+
+    def stage(self, symbol, model, version, t0=None):
+        with self.lock:
+            self.staged[symbol] = (model, version, t0 or time.time())
+        self.staged_event.set()
+
+    def loaded_symbols(self):
+        """Символы с загруженной моделью: уже торгующие и ожидающие apply()."""
+        with self.lock:
+            return set(self.versions) | set(self.staged)
+
+    def wait(self, timeout):
+        """Спит до timeout секунд, но просыпается раньше, если появилась новая модель."""
+        woke = self.staged_event.wait(timeout)
+        self.staged_event.clear()
+        return woke
+
+    def apply(self, models):
+        """Подменяет модели в models. Вызывается между торговыми циклами."""
+        with self.lock:
+            staged, self.staged = self.staged, {}
+            for symbol, (model, version, _) in staged.items():
+                models[symbol] = model
+                self.versions[symbol] = version
+        now = time.time()
+        for symbol, (_, version, t0) in staged.items():
+            logger.info(
+                f"🔁 Модель {symbol} переключена на {version} "
+                f"(задержка перезагрузки {now - t0:.1f}s)"
+            )
+        return list(staged)
+
+    def run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.poll()
+            except Exception as e:
+                logger.error(f"❌ Перезагрузка моделей: {e}")
+
+    def start(self):
+        threading.Thread(target=self.run, daemon=True, name="model-reloader").start()
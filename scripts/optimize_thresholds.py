@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+import os
+import sys
+import time
+import argparse
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from data_fetcher import get_bars, get_funding_history
+from trainer import load_model
+from threshold_optimizer import DEFAULT_GRID, grid_search, precompute_symbol, stack_panels
+
+SYMBOLS = [
+    "BTC/USDT:USDT",
+    "ETH/USDT:USDT",
+    "SOL/USDT:USDT",
+    "BNB/USDT:USDT",
+    "XRP/USDT:USDT",
+    "DOGE/USDT:USDT",
+    "AVAX/USDT:USDT",
+    "SHIB/USDT:USDT",
+    "LINK/USDT:USDT",
+    "PENGU/USDT:USDT",
+]
+
+def main():
+    ap = argparse.ArgumentParser(description="Перебор порогов входа one_symbol_flow")
+    ap.add_argument("--symbols", nargs="*", default=SYMBOLS)
+    # последние 400 + горизонт баров – обучающее окно модели, в оценку не идут
+    ap.add_argument("--bars", type=int, default=1440)
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--min-trades", type=int, default=20)
+    ap.add_argument("--top", type=int, default=20)
+    ap.add_argument("--out", default="threshold_grid.csv")
+    args = ap.parse_args()
+
+    min_volume_usd = float(os.getenv("MIN_VOLUME_USD", "50000"))
+
+    print("🚀 Предрасчёт сигналов и вероятностей")
+    t0 = time.time()
+    panels = []
+    for symbol in args.symbols:
+        model = load_model(symbol)
+        df = get_bars(symbol, "1h", args.bars)
+        if model is None or df is None or len(df) < 700:
+            print(f"  ⏭️  {symbol} пропущен – нет модели или данных")
+            continue
+        panels.append(precompute_symbol(df, model, DEFAULT_GRID["rr"], get_funding_history(symbol)))
+        print(f"  ✅ {symbol}: {len(panels[-1]['prob'])} баров")
+    if not panels:
+        print("❌ Нечего оптимизировать")
+        return
+    panel = stack_panels(panels)
+    print(f"⏱️  Предрасчёт: {time.time() - t0:.1f}s, баров всего {len(panel['prob'])}")
+
+    t0 = time.time()
+    res = grid_search(panel, min_volume_usd=min_volume_usd, workers=args.workers)
+    print(f"⏱️  {len(res)} комбинаций за {time.time() - t0:.1f}s")
+
+    res.to_csv(args.out, index=False)
+    print(f"💾 Полная таблица: {args.out}")
+    print(res[res["trades"] >= args.min_trades].head(args.top).to_string(index=False))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+import os
+import sys
+import time
+import argparse
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pandas as pd
+
+from data_fetcher import get_bars
+from walk_forward import build_configs, walk_forward
+
+HISTORY_DIR = "history"
+SYMBOLS = ["BTC/USDT:USDT", "ETH/USDT:USDT", "SOL/USDT:USDT", "XRP/USDT:USDT", "DOGE/USDT:USDT"]
+
+def load_history(symbol, bars, refresh=False):
+    """Бары из history/<SYMBOL>.csv; при отсутствии или refresh – скачиваем и сохраняем."""
+    clean = symbol.split("/")[0] + symbol.split("/")[1].split(":")[0]
+    path = os.path.join(HISTORY_DIR, clean + ".csv")
+    if os.path.exists(path) and not refresh:
+        return pd.read_csv(path, index_col="timestamp", parse_dates=True)
+    df = get_bars(symbol, "1h", bars)
+    if df is not None:
+        os.makedirs(HISTORY_DIR, exist_ok=True)
+        df.to_csv(path)
+    return df
+
+def lookback_pair(s):
+    a, b = s.split(",")
+    return int(a), int(b)
+
+def main():
+    ap = argparse.ArgumentParser(description="Walk-forward оценка LSTMEnsemble")
+    ap.add_argument("--symbols", nargs="*", default=SYMBOLS)
+    ap.add_argument("--bars", type=int, default=1440)
+    ap.add_argument("--refresh", action="store_true", help="перекачать историю")
+    ap.add_argument("--epochs", type=int, nargs="*", default=[2, 5])
+    ap.add_argument("--bars-back", type=int, nargs="*", default=[400])
+    ap.add_argument("--lookbacks", type=lookback_pair, nargs="*", default=[(60, 90)],
+                    help="пары lookback, например 60,90 30,60")
+    ap.add_argument("--test-bars", type=int, default=48)
+    ap.add_argument("--step", type=int, default=None)
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--out", default="walk_forward")
+    args = ap.parse_args()
+
+    histories = {}
+    for symbol in args.symbols:
+        df = load_history(symbol, args.bars, args.refresh)
+        if df is None:
+            print(f"  ⏭️  {symbol} пропущен – нет данных")
+            continue
+        histories[symbol] = df
+
+    configs = build_configs(args.epochs, args.bars_back, args.lookbacks)
+    print(f"🚀 Walk-forward: {len(histories)} символов × {len(configs)} конфигураций")
+    t0 = time.time()
+    folds, summary = walk_forward(histories, configs, args.test_bars, args.step, args.workers)
+    print(f"⏱️  {len(folds)} фолдов за {time.time() - t0:.1f}s")
+
+    folds.to_csv(args.out + "_folds.csv", index=False)
+    summary.to_csv(args.out + "_summary.csv", index=False)
+    print(summary.to_string(index=False))
+
+if __name__ == "__main__":
+    main()
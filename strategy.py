@@ -48,3 +48,156 @@ def get_market_regime(df):
         return 'trending_down'
     else:
         return 'ranging'
+
+
+# ---------------- Панельный режим ----------------
+# Все символы выравниваются в массивы (символы × время) и индикаторы
+# считаются одним проходом по всей вселенной. Внутри расчёт идёт в float64
+# по тем же формулам, что ta / pandas, поэтому значения совпадают с
+# calculate_strategy_signals; на выходе массивы приводятся к dtype.
+
+PANEL_COLUMNS = [
+    'rsi', 'sma20', 'sma50', 'sma200', 'atr', 'vol_avg', 'strong_volume',
+    'trend_score', 'long_score', 'volatility', 'sma50_slope',
+]
+
+
+def _rolling_mean(x, window):
+    # (S, T) → (S, T); pandas считает по столбцам, поэтому кладём время по строкам
+    return pd.DataFrame(x.T).rolling(window).mean().values.T
+
+
+def _wilder_ewm(x, window):
+    return pd.DataFrame(x.T).ewm(alpha=1 / window, min_periods=window, adjust=False).mean().values.T
+
+
+def _panel_rsi(close, valid, window):
+    diff = np.full_like(close, np.nan)
+    diff[:, 1:] = close[:, 1:] - close[:, :-1]
+    # как в ta: NaN-разность первого бара превращается в 0, но паддинг остаётся NaN
+    up = np.where(valid, np.where(diff > 0, diff, 0.0), np.nan)
+    down = np.where(valid, -np.where(diff < 0, diff, 0.0), np.nan)
+    emaup = _wilder_ewm(up, window)
+    emadn = _wilder_ewm(down, window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = np.where(emadn == 0, 100, 100 - (100 / (1 + emaup / emadn)))
+    return np.where(valid, rsi, np.nan)
+
+
+def _panel_atr(high, low, close, first, window):
+    prev = np.full_like(close, np.nan)
+    prev[:, 1:] = close[:, :-1]
+    tr = np.fmax(np.fmax(high - low, np.abs(high - prev)), np.abs(low - prev))
+
+    rows = np.arange(len(close))
+    seed_col = first + window - 1
+    ok = seed_col < close.shape[1]  # у ta короче окна – исключение, здесь просто нули
+    seg = tr[rows[ok, None], first[ok, None] + np.arange(window)]
+    seed = np.zeros(len(close))
+    seed[ok] = seg.sum(axis=1) / window
+
+    atr = np.zeros_like(close)
+    for i in range(close.shape[1]):
+        step = (atr[:, i - 1] * (window - 1) + tr[:, i]) / float(window) if i else tr[:, i]
+        atr[:, i] = np.where(i == seed_col, seed, np.where(i > seed_col, step, 0.0))
+    return atr
+
+
+def calculate_panel_signals(dfs, minutes=60, dtype=np.float32):
+    """
+    dfs: {symbol: DataFrame OHLCV}. Возвращает dict с ключами symbols, index
+    (объединённая шкала времени), bars и массивами (символы × время) для OHLCV
+    и PANEL_COLUMNS; бары, которых у символа нет, – NaN.
+    """
+    symbols = list(dfs)
+    index = pd.DatetimeIndex(sorted(set().union(*(df.index for df in dfs.values()))))
+    lengths = np.array([len(dfs[s]) for s in symbols])
+    width = lengths.max() if len(symbols) else 0
+    rsi_len = 14 if minutes <= 60 else 21
+    atr_period = 14 if minutes <= 60 else 21
+
+    # Считаем на «сжатой» раскладке: бары каждого символа прижаты вправо без
+    # пропусков, слева NaN – так окна и рекурсии видят ровно ряд символа.
+    first = width - lengths
+    col = {}
+    for name in ['open', 'high', 'low', 'close', 'volume']:
+        arr = np.full((len(symbols), width), np.nan)
+        for i, s in enumerate(symbols):
+            arr[i, first[i]:] = dfs[s][name].values.astype(float)
+        col[name] = arr
+    close, volume = col['close'], col['volume']
+    valid = np.arange(width)[None, :] >= first[:, None]
+
+    col['rsi'] = _panel_rsi(close, valid, rsi_len)
+    col['sma20'] = _rolling_mean(close, 20)
+    col['sma50'] = _rolling_mean(close, 50)
+    col['sma200'] = _rolling_mean(close, 200)
+    col['atr'] = np.where(valid, _panel_atr(col['high'], col['low'], close, first, atr_period), np.nan)
+    col['vol_avg'] = _rolling_mean(volume, 20)
+    prev_volume = np.full_like(volume, np.nan)
+    prev_volume[:, 1:] = volume[:, :-1]
+    strong_volume = (volume > col['vol_avg']) & (volume > prev_volume)
+
+    trend_score = (
+        (close > col['sma20']).astype(int)
+        + (close > col['sma50']).astype(int)
+        + (col['sma20'] > col['sma50']).astype(int)
+        + (close > col['sma200']).astype(int)
+    )
+    long_score = np.clip(
+        trend_score
+        + strong_volume.astype(int)
+        + (col['rsi'] > 55).astype(int)
+        + (col['rsi'] < 70).astype(int),
+        0, 5,
+    )
+    col['strong_volume'] = strong_volume
+    col['trend_score'] = trend_score
+    col['long_score'] = long_score
+
+    pct = np.full_like(close, np.nan)
+    pct[:, 1:] = close[:, 1:] / close[:, :-1] - 1
+    col['volatility'] = pd.DataFrame(pct.T).rolling(20).std().values.T
+    col['sma50_slope'] = np.full_like(close, np.nan)
+    col['sma50_slope'][:, 1:] = col['sma50'][:, 1:] - col['sma50'][:, :-1]
+
+    # Раскладываем сжатые ряды обратно по общей шкале времени
+    panel = {'symbols': symbols, 'index': index, 'bars': lengths}
+    positions = [index.get_indexer(dfs[s].index) for s in symbols]
+    for name, arr in col.items():
+        out = np.full((len(symbols), len(index)), np.nan, dtype=dtype)
+        for i, pos in enumerate(positions):
+            out[i, pos] = arr[i, first[i]:]
+        panel[name] = out
+    return panel
+
+
+def get_market_regime_panel(panel):
+    """get_market_regime для каждого символа панели по его последнему бару."""
+    regimes = {}
+    for i, s in enumerate(panel['symbols']):
+        bars = np.flatnonzero(~np.isnan(panel['close'][i]))
+        slope = panel['sma50_slope'][i, bars[-1]] if len(bars) else np.nan
+        if panel['bars'][i] < 50:
+            regimes[s] = 'ranging'
+        elif slope > 0:
+            regimes[s] = 'trending_up'
+        elif slope < 0:
+            regimes[s] = 'trending_down'
+        else:
+            regimes[s] = 'ranging'
+    return regimes
+
+
+def panel_symbol_frame(panel, symbol):
+    """Строки одного символа в виде DataFrame, как из calculate_strategy_signals."""
+    i = panel['symbols'].index(symbol)
+    rows = ~np.isnan(panel['close'][i])
+    df = pd.DataFrame(
+        {name: panel[name][i, rows] for name in ['open', 'high', 'low', 'close', 'volume'] + PANEL_COLUMNS},
+        index=panel['index'][rows],
+    )
+    df['strong_volume'] = df['strong_volume'].astype(bool)
+    df['trend_score'] = df['trend_score'].astype(int)
+    df['long_score'] = df['long_score'].astype(int)
+    return df
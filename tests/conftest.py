@@ -0,0 +1,34 @@
+import importlib
+import os
+import sys
+import types
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+def _stub_if_missing(name, **attrs):
+    """Пустой модуль вместо неустановленной зависимости: тесты не строят сети и не ходят на биржу."""
+    try:
+        importlib.import_module(name)
+        return False
+    except ImportError:
+        module = types.ModuleType(name)
+        module.__dict__.update(attrs)
+        sys.modules[name] = module
+        parent, _, child = name.rpartition(".")
+        if parent:
+            setattr(sys.modules[parent], child, module)
+        return True
+
+
+def _unavailable(*args, **kwargs):
+    raise RuntimeError("зависимость не установлена в тестовом окружении")
+
+
+_stub_if_missing("ccxt")
+if _stub_if_missing("tensorflow"):
+    _stub_if_missing("tensorflow.keras")
+    _stub_if_missing("tensorflow.keras.models", Sequential=_unavailable)
+    _stub_if_missing("tensorflow.keras.layers", LSTM=_unavailable, Dense=_unavailable, Dropout=_unavailable)
+    _stub_if_missing("tensorflow.keras.optimizers", Adam=_unavailable)
+    _stub_if_missing("tensorflow.keras.backend", clear_session=lambda: None)
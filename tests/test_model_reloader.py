@@ -0,0 +1,110 @@
+import os
+import time
+
+import pytest
+
+import model_reloader
+from model_reloader import ModelReloader, artifact_names
+from weight_sync import MANIFEST, file_sha256, write_json_atomic
+
+SYMBOL = "BTC/USDT:USDT"
+
+
+class FakeModel:
+    is_trained = True
+
+
+@pytest.fixture
+def weights(tmp_path, monkeypatch):
+    """Каталог weights/ в tmp_path и счётчик вызовов trainer.load_model."""
+    monkeypatch.chdir(tmp_path)
+    loads = []
+
+    def load_model(symbol):
+        loads.append(symbol)
+        return FakeModel()
+
+    monkeypatch.setattr(model_reloader, "load_model", load_model)
+    for name in artifact_names(SYMBOL):
+        write(name, name.encode())
+    return loads
+
+
+def write(name, data):
+    os.makedirs("weights", exist_ok=True)
+    with open(os.path.join("weights", name), "wb") as f:
+        f.write(data)
+
+
+def test_stage_swaps_only_on_apply():
+    reloader = ModelReloader([SYMBOL])
+    old, new = FakeModel(), FakeModel()
+    models = {SYMBOL: old}
+
+    reloader.stage(SYMBOL, new, "v2")
+    assert models[SYMBOL] is old
+    assert reloader.loaded_symbols() == {SYMBOL}
+    assert reloader.wait(0)
+
+    assert reloader.apply(models) == [SYMBOL]
+    assert models[SYMBOL] is new
+    assert reloader.versions == {SYMBOL: "v2"}
+    assert reloader.apply(models) == []
+    assert not reloader.wait(0)
+
+
+def test_poll_skips_unchanged_and_staged(weights):
+    reloader = ModelReloader([SYMBOL])
+    version = reloader.fingerprint(SYMBOL)
+
+    reloader.versions[SYMBOL] = version
+    reloader.poll()
+    assert weights == []
+
+    # уже ждёт apply() – повторно не грузим
+    reloader.versions.clear()
+    reloader.stage(SYMBOL, FakeModel(), version)
+    reloader.poll()
+    assert weights == []
+
+    write(artifact_names(SYMBOL)[1], b"m1-v2")
+    reloader.poll()
+    assert weights == [SYMBOL]
+    assert reloader.staged[SYMBOL][1] == reloader.fingerprint(SYMBOL) != version
+
+
+def test_poll_latency_includes_pull(weights):
+    class Sync:
+        def pull(self):
+            self.pulled_at = time.time()
+            write(artifact_names(SYMBOL)[0], b"pkl-v2")
+
+    sync = Sync()
+    reloader = ModelReloader([SYMBOL], sync=sync)
+    reloader.versions[SYMBOL] = reloader.fingerprint(SYMBOL)
+    reloader.poll()
+    assert reloader.staged[SYMBOL][2] <= sync.pulled_at
+
+
+def test_fingerprint_falls_back_to_file_hash(weights):
+    pkl, m1, m2 = artifact_names(SYMBOL)
+    reloader = ModelReloader([SYMBOL])
+    # в манифесте только .pkl; веса обучены локально и в нём не значатся
+    write_json_atomic(os.path.join("weights", MANIFEST), {
+        "version": "x",
+        "artifacts": {pkl: {"sha256": file_sha256(os.path.join("weights", pkl)), "size": 3}},
+    })
+    version = reloader.fingerprint(SYMBOL)
+    assert version is not None
+
+    write(m1, b"m1-v2")
+    changed = reloader.fingerprint(SYMBOL)
+    assert changed != version
+
+    # для .pkl из манифеста решает sha256 в манифесте, а не файл
+    write(pkl, b"pkl-v2")
+    assert reloader.fingerprint(SYMBOL) == changed
+
+    os.remove(os.path.join("weights", m2))
+    assert reloader.fingerprint(SYMBOL) is None
+    assert reloader.load(SYMBOL) == (None, None)
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from strategy import (
+    PANEL_COLUMNS,
+    calculate_panel_signals,
+    calculate_strategy_signals,
+    get_market_regime,
+    get_market_regime_panel,
+    panel_symbol_frame,
+)
+
+
+@pytest.fixture(scope="module")
+def universe():
+    """50 символов разной длины, с пропусками баров и плоскими участками цены/объёма."""
+    rng = np.random.default_rng(1)
+    index = pd.date_range("2024-01-01", periods=400, freq="h")
+    dfs = {}
+    for k in range(50):
+        ix = index[-int(rng.integers(120, 400)):]
+        if k % 7 == 0:
+            ix = ix.delete([30, 31, 90])
+        n = len(ix)
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+        if k % 5 == 0:
+            close[40:80] = close[40]
+        volume = rng.uniform(1e3, 1e4, n)
+        volume[10:15] = volume[10]
+        dfs[f"S{k}"] = pd.DataFrame({
+            "open": close,
+            "high": close * (1 + rng.uniform(0, 0.01, n)),
+            "low": close * (1 - rng.uniform(0, 0.01, n)),
+            "close": close,
+            "volume": volume,
+        }, index=ix)
+    return dfs
+
+
+@pytest.mark.parametrize("minutes", [60, 240])
+def test_panel_matches_per_symbol(universe, minutes):
+    panel = calculate_panel_signals(universe, minutes, dtype=np.float64)
+    regimes = get_market_regime_panel(panel)
+    for symbol, df in universe.items():
+        expected = calculate_strategy_signals(df, minutes)
+        got = panel_symbol_frame(panel, symbol)
+        assert got.index.equals(expected.index)
+        for col in PANEL_COLUMNS:
+            if col == "sma50_slope":
+                want = expected["sma50"].diff().values
+            else:
+                want = expected[col].values.astype(float)
+            assert np.array_equal(got[col].values.astype(float), want, equal_nan=True), (symbol, col)
+        assert regimes[symbol] == get_market_regime(expected), symbol
+
+
+def test_panel_float32_scores_match(universe):
+    panel = calculate_panel_signals(universe, 60)
+    assert panel["close"].dtype == np.float32
+    for symbol, df in universe.items():
+        expected = calculate_strategy_signals(df, 60)
+        got = panel_symbol_frame(panel, symbol)
+        for col in ["strong_volume", "trend_score", "long_score"]:
+            assert (got[col].values == expected[col].values).all(), (symbol, col)
@@ -0,0 +1,127 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from lstm_ensemble import LSTMEnsemble, LSTMPredictor
+from threshold_optimizer import PARAMS, evaluate, forward_outcomes, grid_search
+
+
+def bars(close, high, low, atr=1.0):
+    """Вход по close первого бара, риск 1.5·atr = 1.5."""
+    return pd.DataFrame({"close": close, "high": high, "low": low, "atr": atr})
+
+
+def test_take_profit_before_stop():
+    # long: TP 103 на 1-м баре, SL 98.5 только на 2-м; short: SL 101.5 на 1-м баре
+    df = bars([100, 102, 99, 100], [100, 103.5, 102, 100.5], [100, 101, 98, 99.5])
+    out_long, out_short = forward_outcomes(df, [2.0, 3.0], horizon=3)
+    assert out_long[:, 0].tolist() == [2.0, -1.0]  # TP 104.5 не достигнут, SL сработал
+    assert out_short[:, 0].tolist() == [-1.0, -1.0]
+    assert np.isnan(out_long[:, 1:]).all() and np.isnan(out_short[:, 1:]).all()
+
+
+def test_same_bar_tie_is_stop():
+    # 1-й бар задевает и TP, и SL в обе стороны
+    df = bars([100, 100, 100, 100], [100, 104, 100, 100], [100, 96, 100, 100])
+    out_long, out_short = forward_outcomes(df, [1.0, 2.0], horizon=3)
+    assert out_long[:, 0].tolist() == [-1.0, -1.0]
+    assert out_short[:, 0].tolist() == [-1.0, -1.0]
+
+
+def test_mark_to_market_at_horizon():
+    close = np.array([100, 100.5, 100.2, 100.75])
+    df = bars(close, close + 0.1, close - 0.1)
+    out_long, out_short = forward_outcomes(df, [2.0], horizon=3)
+    assert out_long[0, 0] == pytest.approx(0.5)  # (100.75 - 100) / 1.5
+    assert out_short[0, 0] == pytest.approx(-0.5)
+
+
+def test_zero_atr_is_nan():
+    close = np.array([100, 100.5, 100.2, 100.75])
+    out_long, _ = forward_outcomes(bars(close, close, close, atr=0.0), [2.0], horizon=3)
+    assert np.isnan(out_long).all()
+
+
+def panel():
+    # бары: 0,1 – long; 2 – short; 3 – низкая волатильность; 4 – long-сигнал против режима;
+    # 5 – long-сигнал с малым объёмом
+    f32 = lambda v: np.asarray(v, dtype=np.float32)
+    return {
+        "long_score": f32([5, 4, 0, 5, 5, 5]),
+        "trend_score": f32([3, 4, 0, 5, 5, 5]),
+        "prob": f32([0.7, 0.65, 0.3, 0.9, 0.9, 0.9]),
+        "funding": f32([0, 0.01, -0.01, 0, 0, 0]),
+        "volatility": f32([0.01, 0.01, 0.01, 0.001, 0.01, 0.01]),
+        "regime": f32([1, 1, -1, 1, -1, 1]),
+        "volume_usd": f32([1e4, 1e4, 1e4, 1e4, 1e4, 10]),
+        # строка RR 1.5 заполнена мусором: evaluate должен брать строку RR 2.0
+        "out_long": f32([[9] * 6, [2, -1, 7, 7, 7, 7]]),
+        "out_short": f32([[9] * 6, [7, 7, 0.5, 7, 7, 7]]),
+        "rr": f32([1.5, 2.0]),
+    }
+
+
+def test_evaluate_hand_computed_row():
+    combo = dict(
+        long_min=4, trend_min=3, prob_long=0.6,
+        short_long_max=1, short_trend_max=1, prob_short=0.4,
+        funding=0.05, min_vol=0.005, rr=2.0,
+    )
+    combos = np.array([[combo[p] for p in PARAMS]], dtype=np.float32)
+    trades, n_long, n_short, hit_rate, expectancy = evaluate(panel(), combos, min_volume_usd=1000)[0]
+    assert (trades, n_long, n_short) == (3, 2, 1)
+    assert hit_rate == pytest.approx(2 / 3)
+    assert expectancy == pytest.approx((2 - 1 + 0.5) / 3)
+
+
+def test_grid_search_matches_evaluate():
+    grid = {p: [v] for p, v in zip(PARAMS, [4, 3, 0.6, 1, 1, 0.4, 0.05, 0.005, 2.0])}
+    grid["prob_long"] = [0.6, 0.68]
+    grid["rr"] = [1.5, 2.0]
+    res = grid_search(panel(), grid, min_volume_usd=1000, workers=2)
+    assert len(res) == 4
+    for row in res.itertuples(index=False):
+        combos = np.array([[getattr(row, p) for p in PARAMS]], dtype=np.float32)
+        assert row.trades == evaluate(panel(), combos, 1000)[0, 0]
+
+
+class StubModel:
+    """Вместо Keras: детерминированная функция от окна, форма выхода (n, 1)."""
+
+    def predict(self, X, batch_size=None, verbose=0):
+        X = np.asarray(X)
+        return (0.5 * X[:, -1, 3] + 0.3 * X[:, 0, 0] + 0.2 * X.mean(axis=(1, 2)))[:, None]
+
+
+def ohlcv(n=60, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    return pd.DataFrame({
+        "open": close,
+        "high": close * 1.005,
+        "low": close * 0.995,
+        "close": close,
+        "volume": rng.uniform(1e3, 1e4, n),
+    })
+
+
+def test_predict_proba_batch_matches_predict_proba():
+    df = ohlcv()
+    predictor = LSTMPredictor(lookback=5)
+    predictor.model = StubModel()
+    probs = predictor.predict_proba_batch(df)
+    first = predictor.lookback + 9
+    assert np.isnan(probs[:first]).all()
+    expected = [predictor.predict_proba(df.iloc[:t + 1]) for t in range(first, len(df))]
+    assert np.allclose(probs[first:], expected)
+
+
+def test_ensemble_batch_matches_predict_proba():
+    df = ohlcv(seed=1)
+    ensemble = LSTMEnsemble(lookbacks=(5, 8))
+    ensemble.model1.model = StubModel()
+    ensemble.model2.model = StubModel()
+    probs = ensemble.predict_proba_batch(df)
+    first = 8 + 9
+    expected = [ensemble.predict_proba(df.iloc[:t + 1]) for t in range(first, len(df))]
+    assert np.allclose(probs[first:], expected)
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import walk_forward
+from lstm_ensemble import LSTMPredictor
+from walk_forward import fold_tensors, make_folds, run_fold
+
+
+def ohlcv(n=160, seed=0, trend=0.0):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(trend, 0.01, n)))
+    return pd.DataFrame({
+        "open": close,
+        "high": close * 1.005,
+        "low": close * 0.995,
+        "close": close,
+        "volume": rng.uniform(1e3, 1e4, n),
+    }, index=pd.date_range("2024-01-01", periods=n, freq="h"))
+
+
+def test_make_folds():
+    # последнему тестовому бару нужен следующий бар для метки
+    assert make_folds(100, 50, 10) == [(50, 60), (60, 70), (70, 80), (80, 90)]
+    assert make_folds(101, 50, 10)[-1] == (90, 100)
+    assert make_folds(100, 50, 10, step=20) == [(50, 60), (70, 80)]
+    assert make_folds(60, 50, 10) == []
+
+
+def test_fold_tensors_alignment(tmp_path):
+    df = ohlcv()
+    lookback, bars_back, train_end, test_end = 5, 40, 100, 112
+    X_train, y_train, X_test, y_test = fold_tensors(
+        df, train_end, test_end, lookback, bars_back, str(tmp_path)
+    )
+
+    predictor = LSTMPredictor(lookback)
+    X_ref, y_ref = predictor.training_sequences(df.iloc[train_end - bars_back:train_end], bars_back)
+    assert np.array_equal(X_train, X_ref) and np.array_equal(y_train, y_ref)
+
+    # i-й тестовый бар – train_end + i: ровно то окно, что бот подал бы в predict_proba
+    close = df["close"].values
+    assert len(X_test) == len(y_test) == test_end - train_end
+    for i, t in enumerate(range(train_end, test_end)):
+        window = predictor.prepare_features(df.iloc[:t + 1].tail(lookback + 10))[-lookback:]
+        assert np.allclose(X_test[i], window), t
+        assert y_test[i] == float(close[t + 1] > close[t]), t
+
+    # повторный вызов берёт тензоры из кеша
+    cached = fold_tensors(df, train_end, test_end, lookback, bars_back, str(tmp_path))
+    assert len(list(tmp_path.iterdir())) == 1
+    for got, want in zip(cached, (X_train, y_train, X_test, y_test)):
+        assert np.array_equal(got, want)
+
+
+@pytest.mark.parametrize("error", [ValueError, RuntimeError, MemoryError])
+def test_run_fold_records_errors(monkeypatch, tmp_path, error):
+    def fail(*args, **kwargs):
+        raise error("boom")
+
+    monkeypatch.setattr(walk_forward, "fold_tensors", fail)
+    df = ohlcv(80)
+    result = run_fold({
+        "symbol": "BTC/USDT:USDT", "df": df, "fold": (60, 70),
+        "config": {"epochs": 1, "bars_back": 60, "lookbacks": (5, 8)},
+        "cache_dir": str(tmp_path),
+    })
+    assert result["error"] == f"{error.__name__}: boom"
+    assert result["train_end"] == df.index[60]
+    assert "auc" not in result
@@ -0,0 +1,195 @@
+import os
+import subprocess
+
+import pytest
+
+from weight_sync import DirRemote, GitRemote, WeightSync, copy_atomic, file_sha256, open_remote
+
+
+def write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+@pytest.fixture(params=["dir", "git"])
+def remote_spec(request, tmp_path):
+    if request.param == "dir":
+        path = tmp_path / "remote"
+        path.mkdir()
+    else:
+        path = tmp_path / "remote.git"
+        subprocess.run(["git", "init", "-q", "--bare", str(path)], check=True)
+    return str(path)
+
+
+def make_sync(spec, tmp_path, name):
+    cache = str(tmp_path / f"{name}_cache")
+    return WeightSync(open_remote(spec, cache_dir=cache), str(tmp_path / name), cache)
+
+
+class CountingFetch:
+    """Оборачивает fetch_object удалённого хранилища и запоминает запрошенные хеши."""
+
+    def __init__(self, remote):
+        self.fetched = []
+        self._fetch = remote.fetch_object
+        remote.fetch_object = self
+
+    def __call__(self, sha256, dst):
+        self.fetched.append(sha256)
+        self._fetch(sha256, dst)
+
+
+def test_open_remote_kind(remote_spec):
+    remote = open_remote(remote_spec)
+    assert isinstance(remote, GitRemote if remote_spec.endswith(".git") else DirRemote)
+
+
+def test_push_pull_incremental(remote_spec, tmp_path):
+    src = tmp_path / "a"
+    write(str(src / "BTCUSDT.pkl"), b"scalers")
+    write(str(src / "BTCUSDT.m1.weights.h5"), b"m1")
+    write(str(src / "BTCUSDT.m2.weights.h5"), b"m2")
+
+    # первый push публикует всё
+    assert make_sync(remote_spec, tmp_path, "a").push() == [
+        "BTCUSDT.m1.weights.h5", "BTCUSDT.m2.weights.h5", "BTCUSDT.pkl",
+    ]
+    # повторный push без изменений – no-op
+    assert make_sync(remote_spec, tmp_path, "a").push() == []
+
+    reader = make_sync(remote_spec, tmp_path, "b")
+    assert len(reader.pull()) == 3
+    assert read(str(tmp_path / "b" / "BTCUSDT.m1.weights.h5")) == b"m1"
+    assert os.path.exists(tmp_path / "b" / "manifest.json")
+
+    # меняется один артефакт – публикуется и скачивается только он
+    write(str(src / "BTCUSDT.m1.weights.h5"), b"m1-v2")
+    assert make_sync(remote_spec, tmp_path, "a").push() == ["BTCUSDT.m1.weights.h5"]
+
+    reader = make_sync(remote_spec, tmp_path, "b")
+    counter = CountingFetch(reader.remote)
+    assert reader.pull() == ["BTCUSDT.m1.weights.h5"]
+    assert counter.fetched == [file_sha256(str(src / "BTCUSDT.m1.weights.h5"))]
+    assert read(str(tmp_path / "b" / "BTCUSDT.m1.weights.h5")) == b"m1-v2"
+
+    # ничего не изменилось – ничего не передаётся
+    reader = make_sync(remote_spec, tmp_path, "b")
+    counter = CountingFetch(reader.remote)
+    assert reader.pull() == []
+    assert counter.fetched == []
+
+
+def test_dropped_artifact_removed(remote_spec, tmp_path):
+    src = tmp_path / "a"
+    write(str(src / "BTCUSDT.pkl"), b"btc")
+    write(str(src / "ETHUSDT.pkl"), b"eth")
+    make_sync(remote_spec, tmp_path, "a").push()
+    make_sync(remote_spec, tmp_path, "b").pull()
+    assert os.path.exists(tmp_path / "b" / "ETHUSDT.pkl")
+
+    os.remove(src / "ETHUSDT.pkl")
+    make_sync(remote_spec, tmp_path, "a").push()
+    make_sync(remote_spec, tmp_path, "b").pull()
+    assert not os.path.exists(tmp_path / "b" / "ETHUSDT.pkl")
+    assert read(str(tmp_path / "b" / "BTCUSDT.pkl")) == b"btc"
+
+
+def git_objects(repo):
+    out = subprocess.run(
+        ["git", "-C", repo, "cat-file", "--batch-all-objects", "--batch-check=%(objectname)"],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return set(out.split())
+
+
+def git_blob(data, tmp_path):
+    path = tmp_path / "blob.tmp"
+    write(str(path), data)
+    sha = subprocess.run(
+        ["git", "hash-object", str(path)], check=True, capture_output=True, text=True,
+    ).stdout.strip()
+    os.remove(path)
+    return sha
+
+
+def test_old_versions_evicted(remote_spec, tmp_path):
+    src = tmp_path / "a"
+    write(str(src / "BTCUSDT.pkl"), b"v1")
+    make_sync(remote_spec, tmp_path, "a").push()
+    make_sync(remote_spec, tmp_path, "b").pull()
+    old = file_sha256(str(src / "BTCUSDT.pkl"))
+
+    write(str(src / "BTCUSDT.pkl"), b"v2")
+    make_sync(remote_spec, tmp_path, "a").push()
+    reader = make_sync(remote_spec, tmp_path, "b")
+    reader.pull()
+    new = file_sha256(str(src / "BTCUSDT.pkl"))
+
+    assert os.path.exists(reader.cache_path(new))
+    assert not os.path.exists(reader.cache_path(old))
+    assert not os.path.exists(os.path.dirname(reader.cache_path(old)))
+    if isinstance(reader.remote, GitRemote):
+        # блоб прежней версии вычищен из клона
+        objects = git_objects(reader.remote.root)
+        assert git_blob(b"v2", tmp_path) in objects
+        assert git_blob(b"v1", tmp_path) not in objects
+
+
+def test_legacy_layout_pull_and_migrate(tmp_path):
+    # ветка weights в старой раскладке: артефакты в корне, манифеста нет
+    remote = tmp_path / "remote"
+    write(str(remote / "BTCUSDT.pkl"), b"old-btc")
+    write(str(remote / "BTCUSDT.m1.weights.h5"), b"old-m1")
+
+    assert sorted(make_sync(str(remote), tmp_path, "b").pull()) == [
+        "BTCUSDT.m1.weights.h5", "BTCUSDT.pkl",
+    ]
+    assert read(str(tmp_path / "b" / "BTCUSDT.pkl")) == b"old-btc"
+
+    # push тех же файлов переводит хранилище на objects/ и убирает корневые артефакты
+    write(str(tmp_path / "a" / "BTCUSDT.pkl"), b"old-btc")
+    write(str(tmp_path / "a" / "BTCUSDT.m1.weights.h5"), b"old-m1")
+    make_sync(str(remote), tmp_path, "a").push()
+    assert sorted(os.listdir(remote)) == ["manifest.json", "objects"]
+    assert len(os.listdir(remote / "objects")) == 2
+    assert make_sync(str(remote), tmp_path, "c").pull() == ["BTCUSDT.m1.weights.h5", "BTCUSDT.pkl"]
+
+
+def test_legacy_git_branch_cleaned(tmp_path):
+    bare = tmp_path / "remote.git"
+    subprocess.run(["git", "init", "-q", "--bare", str(bare)], check=True)
+    seed = tmp_path / "seed"
+    subprocess.run(["git", "init", "-q", "-b", "weights", str(seed)], check=True)
+    write(str(seed / "BTCUSDT.pkl"), b"old-btc")
+    git = ["git", "-C", str(seed), "-c", "user.name=t", "-c", "user.email=t@t"]
+    subprocess.run(git + ["add", "-A"], check=True)
+    subprocess.run(git + ["commit", "-q", "-m", "legacy"], check=True)
+    subprocess.run(git + ["push", "-q", str(bare), "weights"], check=True)
+
+    assert make_sync(str(bare), tmp_path, "b").pull() == ["BTCUSDT.pkl"]
+
+    write(str(tmp_path / "a" / "BTCUSDT.pkl"), b"new-btc")
+    make_sync(str(bare), tmp_path, "a").push()
+    tree = subprocess.run(
+        ["git", "-C", str(bare), "ls-tree", "-r", "--name-only", "weights"],
+        check=True, capture_output=True, text=True,
+    ).stdout.split()
+    assert "BTCUSDT.pkl" not in tree
+    assert "manifest.json" in tree
+
+
+def test_copy_atomic_checksum_mismatch(tmp_path):
+    src = tmp_path / "src.bin"
+    dst = tmp_path / "out" / "dst.bin"
+    write(str(src), b"payload")
+    with pytest.raises(ValueError):
+        copy_atomic(str(src), str(dst), "0" * 64)
+    assert not os.path.exists(dst)
+    assert os.listdir(tmp_path / "out") == []
@@ -0,0 +1,219 @@
+# threshold_optimizer.py
+"""
+Векторизованный перебор порогов входа из main.one_symbol_flow.
+
+1. precompute_symbol() один раз считает для каждого бара сигналы стратегии,
+   вероятность ансамбля, funding, режим рынка и исход сделки в R
+   (SL = 1.5·ATR, TP = RR·SL, как в risk_manager) для каждого RR из сетки.
+2. evaluate() проверяет сразу пачку комбинаций порогов: маски имеют форму
+   (комбинации × бары) и считаются broadcasting'ом NumPy.
+3. grid_search() режет сетку на пачки и раздаёт их ProcessPoolExecutor.
+
+Каждый бар, прошедший фильтры, считается отдельной сделкой: удержание
+позиции и лимит MAX_POSITIONS не моделируются.
+
+Вероятности берутся у боевой модели (trainer.load_model), а она обучена на
+последних TRAIN_BARS барах. Эти бары (и horizon перед ними, чьи исходы
+заходят в окно обучения) в оценку не попадают – иначе сетка награждала бы
+пороги prob, работающие только на запомненных данных.
+"""
+
+import itertools
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from strategy import calculate_strategy_signals
+
+PARAMS = [
+    "long_min", "trend_min", "prob_long",
+    "short_long_max", "short_trend_max", "prob_short",
+    "funding", "min_vol", "rr",
+]
+
+DEFAULT_GRID = {
+    "long_min": [3, 4, 5],
+    "trend_min": [2, 3, 4],
+    "prob_long": [0.50, 0.55, 0.60, 0.65, 0.70],
+    "short_long_max": [1, 2, 3],
+    "short_trend_max": [0, 1, 2],
+    "prob_short": [0.25, 0.30, 0.35, 0.40, 0.45],
+    "funding": [0.02, 0.05, 0.10],
+    "min_vol": [0.002, 0.005, 0.010],
+    "rr": [1.5, 2.0, 2.5, 3.0],
+}
+
+HORIZON = int(os.getenv("OPT_HORIZON_BARS", "24"))
+TRAIN_BARS = 400  # окно LSTMEnsemble.train(bars_back=400) у боевых моделей
+CHUNK = 256
+SIGNALS = ["long_score", "trend_score", "prob", "funding", "volatility", "regime", "volume_usd"]
+
+_panel = None  # данные воркера, выставляются в _init_worker
+
+
+def _first_hit(mask):
+    # Индекс первого True в каждой строке, len(row) если срабатывания нет
+    return np.where(mask.any(axis=1), mask.argmax(axis=1), mask.shape[1])
+
+
+def forward_outcomes(df, rr_values, horizon=HORIZON):
+    """
+    Исход входа по close каждого бара в единицах риска, форма (len(rr_values), len(df)).
+    TP → +RR, SL → -1 (если оба в одном баре – считаем SL), иначе переоценка
+    по close через horizon баров. Бары без полного горизонта – NaN.
+    """
+    close = df["close"].values.astype(float)
+    high = df["high"].values.astype(float)
+    low = df["low"].values.astype(float)
+    risk = df["atr"].values.astype(float) * 1.5
+
+    n = len(close)
+    out_long = np.full((len(rr_values), n), np.nan, dtype=np.float32)
+    out_short = np.full((len(rr_values), n), np.nan, dtype=np.float32)
+    m = n - horizon
+    if m <= 0:
+        return out_long, out_short
+
+    idx = np.arange(m)[:, None] + np.arange(1, horizon + 1)[None, :]
+    hi, lo = high[idx], low[idx]
+    c0, r = close[:m, None], risk[:m, None]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mtm = (close[idx[:, -1]] - close[:m]) / risk[:m]
+    sl_long = _first_hit(lo <= c0 - r)
+    sl_short = _first_hit(hi >= c0 + r)
+
+    for k, rr in enumerate(rr_values):
+        tp_long = _first_hit(hi >= c0 + rr * r)
+        tp_short = _first_hit(lo <= c0 - rr * r)
+        out_long[k, :m] = np.where(tp_long < sl_long, rr, np.where(sl_long < horizon, -1.0, mtm))
+        out_short[k, :m] = np.where(tp_short < sl_short, rr, np.where(sl_short < horizon, -1.0, -mtm))
+
+    bad = ~(risk[:m] > 0)
+    out_long[:, :m][:, bad] = np.nan
+    out_short[:, :m][:, bad] = np.nan
+    return out_long, out_short
+
+
+def precompute_symbol(df, model, rr_values=DEFAULT_GRID["rr"], funding=None, horizon=HORIZON,
+                      train_bars=TRAIN_BARS):
+    """Столбцы сигналов и исходы сделок для вневыборочных баров одного символа."""
+    rr_values = sorted(rr_values)
+    df = calculate_strategy_signals(df, 60)
+    cols = {
+        "long_score": df["long_score"].values,
+        "trend_score": df["trend_score"].values,
+        "prob": model.predict_proba_batch(df),
+        "volatility": df["volatility"].values,
+        # get_market_regime по каждому бару: знак наклона sma50
+        "regime": np.sign(df["sma50"].diff().fillna(0.0).values),
+        "volume_usd": (df["volume"] * df["close"]).values,
+    }
+    if funding is not None and len(funding):
+        cols["funding"] = funding.reindex(df.index, method="ffill").fillna(0.0).values
+    else:
+        cols["funding"] = np.zeros(len(df))
+    out_long, out_short = forward_outcomes(df, rr_values, horizon)
+
+    valid = (
+        np.isfinite(out_long[0])
+        & np.isfinite(cols["prob"])
+        & np.isfinite(cols["volatility"])
+        # бот решает по окну из 200 баров, где sma200 уже определена
+        & np.isfinite(df["sma200"].values)
+    )
+    valid[max(len(df) - train_bars - horizon, 0):] = False  # in-sample для модели
+    panel = {k: np.asarray(v, dtype=np.float32)[valid] for k, v in cols.items()}
+    panel["out_long"] = out_long[:, valid]
+    panel["out_short"] = out_short[:, valid]
+    panel["rr"] = np.asarray(rr_values, dtype=np.float32)
+    return panel
+
+
+def stack_panels(panels):
+    """Склеивает бары всех символов в один массив."""
+    panels = [p for p in panels if len(p["prob"])]
+    stacked = {k: np.concatenate([p[k] for p in panels]) for k in SIGNALS}
+    stacked["out_long"] = np.concatenate([p["out_long"] for p in panels], axis=1)
+    stacked["out_short"] = np.concatenate([p["out_short"] for p in panels], axis=1)
+    stacked["rr"] = panels[0]["rr"]
+    return stacked
+
+
+def build_grid(grid=None):
+    grid = {**DEFAULT_GRID, **(grid or {})}
+    return np.array(list(itertools.product(*(grid[p] for p in PARAMS))), dtype=np.float32)
+
+
+def evaluate(panel, combos, min_volume_usd=0.0):
+    """
+    Метрики для пачки комбинаций (K × len(PARAMS)).
+    Возвращает (K × 5): trades, long_trades, short_trades, hit_rate, expectancy (в R).
+    """
+    col = {p: combos[:, i][:, None] for i, p in enumerate(PARAMS)}
+    ls, ts, prob = panel["long_score"], panel["trend_score"], panel["prob"]
+    funding, vol, regime = panel["funding"], panel["volatility"], panel["regime"]
+
+    common = (vol > col["min_vol"]) & (panel["volume_usd"] >= min_volume_usd)
+    longs = (
+        common
+        & (ls >= col["long_min"])
+        & (ts >= col["trend_min"])
+        & (prob > col["prob_long"])
+        & (funding < col["funding"])
+        & (regime > 0)
+    )
+    shorts = (
+        common
+        & (ls <= col["short_long_max"])
+        & (ts <= col["short_trend_max"])
+        & (prob < col["prob_short"])
+        & (funding > -col["funding"])
+        & (regime < 0)
+    )
+
+    rr_idx = np.searchsorted(panel["rr"], combos[:, PARAMS.index("rr")])
+    out_long = panel["out_long"][rr_idx]
+    out_short = panel["out_short"][rr_idx]
+
+    n_long = longs.sum(axis=1)
+    n_short = shorts.sum(axis=1)
+    trades = n_long + n_short
+    wins = (longs & (out_long > 0)).sum(axis=1) + (shorts & (out_short > 0)).sum(axis=1)
+    pnl = np.where(longs, out_long, 0.0).sum(axis=1) + np.where(shorts, out_short, 0.0).sum(axis=1)
+    denom = np.maximum(trades, 1)
+    return np.column_stack([trades, n_long, n_short, wins / denom, pnl / denom])
+
+
+def _init_worker(panel, min_volume_usd):
+    global _panel
+    _panel = (panel, min_volume_usd)
+
+
+def _evaluate_chunk(combos):
+    panel, min_volume_usd = _panel
+    return evaluate(panel, combos, min_volume_usd)
+
+
+def grid_search(panel, grid=None, min_volume_usd=0.0, workers=None):
+    """Перебирает всю сетку и возвращает DataFrame с метриками по каждой комбинации."""
+    combos = build_grid(grid)
+    missing = set(combos[:, PARAMS.index("rr")]) - set(panel["rr"])
+    if missing:
+        raise ValueError(f"RR {sorted(missing)} не предрассчитаны в панели")
+    chunks = [combos[i:i + CHUNK] for i in range(0, len(combos), CHUNK)]
+
+    # spawn: боевая модель в родителе уже импортировала TensorFlow, а он не переживает fork
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(panel, min_volume_usd),
+    ) as pool:
+        metrics = np.concatenate(list(pool.map(_evaluate_chunk, chunks)))
+
+    res = pd.DataFrame(combos, columns=PARAMS)
+    res[["trades", "long_trades", "short_trades", "hit_rate", "expectancy"]] = metrics
+    return res.sort_values(["expectancy", "trades"], ascending=False, ignore_index=True)
@@ -0,0 +1,195 @@
+# walk_forward.py
+"""
+Walk-forward оценка LSTMEnsemble.
+
+История символа режется на скользящие фолды: ансамбль обучается на
+bars_back баров перед train_end и предсказывает следующие test_bars баров
+так же, как это делает бот (predict_proba по окну lookback + 10).
+Тестовые отрезки одинаковы для всех конфигураций, поэтому AUC, калибровку
+и время обучения разных epochs / bars_back / lookbacks можно сравнивать.
+
+Фолды обучаются параллельно в отдельных процессах. Нормированные признаки
+и тензоры окон каждого фолда кешируются в WF_CACHE (.npz по хешу данных и
+параметров), так что повторный прогон тратит время только на fit.
+"""
+
+import hashlib
+import itertools
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import tensorflow as tf
+from sklearn.metrics import roc_auc_score
+
+from lstm_ensemble import LSTMPredictor
+
+CACHE_DIR = os.getenv("WF_CACHE", ".wf_cache")
+CALIBRATION_BINS = 10
+
+
+def make_folds(n, train_bars, test_bars, step=None):
+    """(train_end, test_end) для каждого фолда; последний бар нужен для метки."""
+    step = step or test_bars
+    folds = []
+    train_end = train_bars
+    while train_end + test_bars <= n - 1:
+        folds.append((train_end, train_end + test_bars))
+        train_end += step
+    return folds
+
+
+def fold_tensors(df, train_end, test_end, lookback, bars_back, cache_dir=CACHE_DIR):
+    """Обучающие и тестовые тензоры одного фолда для одного lookback (с кешем)."""
+    start = train_end - bars_back
+    raw = df[['open', 'high', 'low', 'close', 'volume']].values[start:test_end + 1].astype(float)
+    key = hashlib.sha1(raw.tobytes() + f"{lookback}:{bars_back}:{test_end - train_end}".encode()).hexdigest()
+    path = os.path.join(cache_dir, key + ".npz")
+    if os.path.exists(path):
+        with np.load(path) as cached:
+            return cached["X_train"], cached["y_train"], cached["X_test"], cached["y_test"]
+
+    predictor = LSTMPredictor(lookback)
+    X_train, y_train = predictor.training_sequences(df.iloc[start:train_end], bars_back)
+    # Окна для тестовых баров: ctx начинается за lookback + 9 баров до train_end,
+    # поэтому первое полное окно заканчивается ровно на train_end
+    ctx = df.iloc[train_end - lookback - 9:test_end]
+    X_test, _ = predictor.prediction_sequences(ctx)
+    close = df['close'].values
+    y_test = (close[train_end + 1:test_end + 1] > close[train_end:test_end]).astype(float)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp = path + f".{os.getpid()}.tmp.npz"
+    np.savez(tmp, X_train=X_train, y_train=y_train, X_test=X_test, y_test=y_test)
+    os.replace(tmp, path)
+    return X_train, y_train, X_test, y_test
+
+
+def calibration_error(probs, labels, bins=CALIBRATION_BINS):
+    """Expected calibration error: средний |частота роста − вероятность| по корзинам."""
+    idx = np.minimum((probs * bins).astype(int), bins - 1)
+    ece = 0.0
+    for b in range(bins):
+        sel = idx == b
+        if sel.any():
+            ece += sel.mean() * abs(labels[sel].mean() - probs[sel].mean())
+    return float(ece)
+
+
+def score(probs, labels):
+    return {
+        "auc": roc_auc_score(labels, probs) if len(np.unique(labels)) == 2 else np.nan,
+        "brier": float(np.mean((probs - labels) ** 2)),
+        "ece": calibration_error(probs, labels),
+        "accuracy": float(np.mean((probs > 0.5) == labels)),
+    }
+
+
+def run_fold(task):
+    """Обучает ансамбль на одном фолде и оценивает его на следующем окне."""
+    df, config = task["df"], task["config"]
+    train_end, test_end = task["fold"]
+    result = {"symbol": task["symbol"], "train_end": df.index[train_end], **config_columns(config)}
+    # Воркер пула обучает много фолдов подряд: без сброса графы и веса прошлых
+    # моделей копятся в памяти процесса
+    tf.keras.backend.clear_session()
+    try:
+        probs, train_sec, predict_sec = [], 0.0, 0.0
+        for lookback in config["lookbacks"]:
+            X_train, y_train, X_test, y_test = fold_tensors(
+                df, train_end, test_end, lookback, config["bars_back"], task["cache_dir"]
+            )
+            predictor = LSTMPredictor(lookback)
+            predictor.build_model((lookback, 5))
+            t0 = time.time()
+            predictor.fit_sequences(X_train, y_train, epochs=config["epochs"])
+            t1 = time.time()
+            probs.append(predictor.predict_sequences(X_test))
+            train_sec += t1 - t0
+            predict_sec += time.time() - t1
+    except Exception as e:
+        # например, «Данные содержат только один класс» или OOM – фолд пропускаем,
+        # остальные задачи пула продолжают работу
+        return {**result, "error": f"{type(e).__name__}: {e}"}
+
+    probs = np.mean(probs, axis=0)  # как LSTMEnsemble.predict_proba
+    return {
+        **result,
+        **score(probs, y_test),
+        "train_sec": train_sec,
+        "predict_sec": predict_sec,
+        "probs": probs,
+        "labels": y_test,
+    }
+
+
+def config_columns(config):
+    return {
+        "epochs": config["epochs"],
+        "bars_back": config["bars_back"],
+        "lookbacks": "/".join(map(str, config["lookbacks"])),
+    }
+
+
+def build_configs(epochs=(5,), bars_back=(400,), lookbacks=((60, 90),)):
+    return [
+        {"epochs": e, "bars_back": b, "lookbacks": tuple(lb)}
+        for e, b, lb in itertools.product(epochs, bars_back, lookbacks)
+    ]
+
+
+def walk_forward(histories, configs, test_bars=48, step=None, workers=None, cache_dir=CACHE_DIR):
+    """
+    histories: {symbol: DataFrame OHLCV}. Возвращает (folds, summary):
+    метрики по каждому фолду и сводку по конфигурациям.
+    """
+    max_train = max(c["bars_back"] for c in configs)
+    for c in configs:
+        if c["bars_back"] < max(c["lookbacks"]) + 12:
+            raise ValueError(f"bars_back={c['bars_back']} слишком мал для lookback {c['lookbacks']}")
+
+    tasks = []
+    for symbol, df in histories.items():
+        for train_end, test_end in make_folds(len(df), max_train, test_bars, step):
+            # в процесс уходит только нужный кусок истории
+            window = df.iloc[train_end - max_train:test_end + 1]
+            for config in configs:
+                tasks.append({
+                    "symbol": symbol, "df": window, "fold": (max_train, max_train + test_bars),
+                    "config": config, "cache_dir": cache_dir,
+                })
+
+    # spawn: TensorFlow не переживает fork после импорта
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        results = list(pool.map(run_fold, tasks))
+
+    folds = pd.DataFrame([{k: v for k, v in r.items() if k not in ("probs", "labels")} for r in results])
+    rows = []
+    for config in configs:
+        cols = config_columns(config)
+        done = [r for r in results if "error" not in r and all(r[k] == v for k, v in cols.items())]
+        if not done:
+            continue
+        probs = np.concatenate([r["probs"] for r in done])
+        labels = np.concatenate([r["labels"] for r in done])
+        pooled = score(probs, labels)
+        rows.append({
+            **cols,
+            "folds": len(done),
+            "auc_mean": np.nanmean([r["auc"] for r in done]),
+            "auc_std": np.nanstd([r["auc"] for r in done]),
+            "auc_pooled": pooled["auc"],
+            "brier": pooled["brier"],
+            "ece": pooled["ece"],
+            "accuracy": pooled["accuracy"],
+            "train_sec": np.mean([r["train_sec"] for r in done]),
+            "predict_sec": np.mean([r["predict_sec"] for r in done]),
+        })
+    summary = pd.DataFrame(rows)
+    if len(summary):
+        summary = summary.sort_values("auc_pooled", ascending=False, ignore_index=True)
+    return folds, summary
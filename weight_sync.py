@@ -0,0 +1,343 @@
+# weight_sync.py
+"""
+Инкрементальная синхронизация весов через content-addressed хранилище.
+
+Раскладка удалённого хранилища (каталог или ветка git-репозитория):
+    manifest.json            – {"version": ..., "artifacts": {имя: {"sha256", "size"}}}
+    objects/<sha256>         – содержимое артефактов, адресуемое хешем
+
+Локально:
+    weights/manifest.json    – манифест установленной версии
+    .weights_cache/objects/  – кеш объектов установленной версии
+
+Передаются только артефакты с изменившимся хешем, каждый объект
+проверяется по sha256, а манифест пишется последним – после его
+замены все файлы новой версии уже на месте.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+
+WEIGHTS_DIR = "weights"  # тот же каталог, что trainer.MODEL_DIR
+MANIFEST = "manifest.json"
+CACHE_DIR = os.getenv("WEIGHTS_CACHE", ".weights_cache")
+ARTIFACT_EXT = (".pkl", ".weights.h5")
+CHUNK = 1 << 20
+
+logger = logging.getLogger("weight_sync")
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def manifest_version(artifacts):
+    # Версия = хеш от отсортированных пар имя:sha256
+    h = hashlib.sha256()
+    for name in sorted(artifacts):
+        h.update(f"{name}:{artifacts[name]['sha256']}\n".encode())
+    return h.hexdigest()[:12]
+
+
+def build_manifest(weights_dir=WEIGHTS_DIR):
+    artifacts = {}
+    if os.path.isdir(weights_dir):
+        for fname in sorted(os.listdir(weights_dir)):
+            path = os.path.join(weights_dir, fname)
+            if fname.endswith(ARTIFACT_EXT) and os.path.isfile(path):
+                artifacts[fname] = {
+                    "sha256": file_sha256(path),
+                    "size": os.path.getsize(path),
+                }
+    return {"version": manifest_version(artifacts), "artifacts": artifacts}
+
+
+def read_manifest(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_json_atomic(path, data):
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".manifest-")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def copy_atomic(src, dst, sha256=None):
+    """Копирует src → dst через временный файл; при заданном sha256 сверяет хеш."""
+    directory = os.path.dirname(dst) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".part-")
+    os.close(fd)
+    try:
+        shutil.copyfile(src, tmp)
+        if sha256 is not None and file_sha256(tmp) != sha256:
+            raise ValueError(f"Контрольная сумма не совпала: {os.path.basename(dst)}")
+        os.replace(tmp, dst)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+class DirRemote:
+    """Удалённое хранилище в обычном каталоге (сетевой диск, volume, тесты)."""
+
+    def __init__(self, root):
+        self.root = root
+        self.legacy = {}  # sha256 -> путь артефакта в корне (раскладка до манифеста)
+
+    def object_path(self, sha256):
+        return os.path.join(self.root, "objects", sha256)
+
+    def read_manifest(self):
+        manifest = read_manifest(os.path.join(self.root, MANIFEST))
+        if manifest or not os.path.isdir(self.root):
+            self.legacy = {}
+            return manifest
+        # Старая раскладка: *.pkl / *.weights.h5 лежат в корне без манифеста
+        manifest = build_manifest(self.root)
+        if not manifest["artifacts"]:
+            return None
+        self.legacy = {
+            meta["sha256"]: os.path.join(self.root, name)
+            for name, meta in manifest["artifacts"].items()
+        }
+        return {**manifest, "legacy": True}
+
+    def has_object(self, sha256):
+        return os.path.exists(self.object_path(sha256))
+
+    def fetch_object(self, sha256, dst):
+        copy_atomic(self.legacy.get(sha256, self.object_path(sha256)), dst, sha256)
+
+    def put_object(self, sha256, src):
+        copy_atomic(src, self.object_path(sha256), sha256)
+
+    def write_manifest(self, manifest):
+        write_json_atomic(os.path.join(self.root, MANIFEST), manifest)
+
+    def prune(self, keep):
+        # Артефакты старой раскладки в корне больше не нужны – всё живёт в objects/
+        for name in os.listdir(self.root):
+            if name.endswith(ARTIFACT_EXT) and os.path.isfile(os.path.join(self.root, name)):
+                os.remove(os.path.join(self.root, name))
+        self.legacy = {}
+        objects_dir = os.path.join(self.root, "objects")
+        if not os.path.isdir(objects_dir):
+            return
+        for name in os.listdir(objects_dir):
+            if name not in keep:
+                os.remove(os.path.join(objects_dir, name))
+
+    def refresh(self):
+        pass
+
+    def commit(self, message):
+        pass
+
+
+class GitRemote(DirRemote):
+    """
+    Хранилище в ветке git-репозитория (URL или bare-репозиторий).
+    Держит неглубокий клон в кеше и обновляет его через fetch --depth 1:
+    объекты с прежним хешем уже есть локально и повторно не передаются.
+    """
+
+    def __init__(self, url, branch="weights", cache_dir=CACHE_DIR):
+        super().__init__(os.path.join(cache_dir, "remote"))
+        self.url = url
+        self.branch = branch
+
+    def git(self, *args, check=True):
+        return subprocess.run(
+            ["git", "-C", self.root, *args],
+            check=check, capture_output=True, text=True,
+        )
+
+    def refresh(self):
+        if not os.path.isdir(os.path.join(self.root, ".git")):
+            os.makedirs(self.root, exist_ok=True)
+            self.git("init", "-q")
+            self.git("remote", "add", "origin", self.url)
+        before = self.git("rev-parse", "-q", "--verify", "HEAD", check=False).stdout.strip()
+        fetched = self.git("fetch", "-q", "--depth", "1", "origin", self.branch, check=False)
+        if fetched.returncode == 0:
+            self.git("checkout", "-q", "-B", self.branch, "FETCH_HEAD")
+            self.git("reset", "-q", "--hard", "FETCH_HEAD")
+            self.git("clean", "-qfd")
+            if before and before != self.git("rev-parse", "HEAD").stdout.strip():
+                self.gc()
+        else:
+            # Ветки ещё нет – начнём её с пустой истории при первом push
+            logger.info(f"Ветка {self.branch} не найдена в {self.url} – будет создана")
+            self.git("checkout", "-q", "--orphan", self.branch, check=False)
+
+    def gc(self):
+        # Прежний коммит после fetch --depth 1 недостижим, но его блобы остаются
+        # в .git: без очистки клон растёт на размер каждой версии весов
+        self.git("reflog", "expire", "--expire=now", "--all")
+        self.git("gc", "-q", "--prune=now")
+
+    def commit(self, message):
+        # add -A фиксирует и удаления: prune() убрал корневые артефакты старой раскладки
+        self.git("add", "-A")
+        if self.git("diff", "--cached", "--quiet", check=False).returncode == 0:
+            return False
+        self.git(
+            "-c", "user.name=github-actions[bot]",
+            "-c", "user.email=41898282+github-actions[bot]@users.noreply.github.com",
+            "commit", "-q", "-m", message,
+        )
+        self.git("push", "-q", "origin", f"HEAD:refs/heads/{self.branch}")
+        return True
+
+
+def is_git_remote(spec):
+    if spec.startswith(("http://", "https://", "git@", "ssh://", "file://")) or spec.endswith(".git"):
+        return True
+    # bare-репозиторий: HEAD и refs/ лежат прямо в корне
+    return (
+        os.path.isdir(os.path.join(spec, ".git"))
+        or (os.path.isfile(os.path.join(spec, "HEAD")) and os.path.isdir(os.path.join(spec, "refs")))
+    )
+
+
+def open_remote(spec, branch="weights", cache_dir=CACHE_DIR):
+    if is_git_remote(spec):
+        return GitRemote(spec, branch=branch, cache_dir=cache_dir)
+    return DirRemote(spec)
+
+
+class WeightSync:
+    def __init__(self, remote, weights_dir=WEIGHTS_DIR, cache_dir=CACHE_DIR):
+        self.remote = remote
+        self.weights_dir = weights_dir
+        self.cache_dir = cache_dir
+
+    def cache_path(self, sha256):
+        return os.path.join(self.cache_dir, "objects", sha256[:2], sha256)
+
+    def local_manifest(self):
+        return read_manifest(os.path.join(self.weights_dir, MANIFEST))
+
+    def evict(self, keep):
+        """Удаляет из кеша объекты, которых нет в keep (sha256 текущей версии)."""
+        objects_dir = os.path.join(self.cache_dir, "objects")
+        if not os.path.isdir(objects_dir):
+            return 0
+        removed = 0
+        for prefix in os.listdir(objects_dir):
+            bucket = os.path.join(objects_dir, prefix)
+            for name in os.listdir(bucket):
+                if name not in keep:
+                    os.remove(os.path.join(bucket, name))
+                    removed += 1
+            if not os.listdir(bucket):
+                os.rmdir(bucket)
+        return removed
+
+    def ensure_cached(self, sha256):
+        path = self.cache_path(sha256)
+        if os.path.exists(path) and file_sha256(path) == sha256:
+            return path, False
+        self.remote.fetch_object(sha256, path)
+        return path, True
+
+    def pull(self):
+        """Подтягивает изменившиеся артефакты. Возвращает список обновлённых имён."""
+        self.remote.refresh()
+        remote = self.remote.read_manifest()
+        if not remote:
+            logger.warning("Удалённый манифест весов не найден")
+            return []
+        if remote.pop("legacy", False):
+            logger.info("Удалённые веса в старой раскладке без манифеста – ставим файлы из корня")
+
+        local = self.local_manifest() or {"artifacts": {}}
+        wanted = remote["artifacts"]
+        changed = [
+            name for name, meta in sorted(wanted.items())
+            if local["artifacts"].get(name, {}).get("sha256") != meta["sha256"]
+            or not os.path.exists(os.path.join(self.weights_dir, name))
+        ]
+        if not changed and local.get("version") == remote["version"]:
+            return []
+
+        # 1. скачиваем всё недостающее в кеш (с проверкой хеша)
+        transferred = 0
+        for name in changed:
+            _, fetched = self.ensure_cached(wanted[name]["sha256"])
+            transferred += wanted[name]["size"] if fetched else 0
+
+        # 2. ставим файлы на место, каждый через os.replace
+        for name in changed:
+            copy_atomic(
+                self.cache_path(wanted[name]["sha256"]),
+                os.path.join(self.weights_dir, name),
+                wanted[name]["sha256"],
+            )
+        for name in set(local["artifacts"]) - set(wanted):
+            path = os.path.join(self.weights_dir, name)
+            if os.path.exists(path):
+                os.remove(path)
+
+        # 3. манифест последним – по нему ориентируются загрузчики моделей
+        write_json_atomic(os.path.join(self.weights_dir, MANIFEST), remote)
+        self.evict({meta["sha256"] for meta in wanted.values()})
+        logger.info(
+            f"Веса обновлены до {remote['version']}: {len(changed)} файлов, "
+            f"передано {transferred} байт"
+        )
+        return changed
+
+    def push(self, message="🤖 Retrain (2h walk-forward)"):
+        """Публикует локальные веса. Возвращает список изменившихся имён."""
+        self.remote.refresh()
+        manifest = build_manifest(self.weights_dir)
+        remote = self.remote.read_manifest() or {"artifacts": {}}
+        changed = [
+            name for name, meta in manifest["artifacts"].items()
+            if remote["artifacts"].get(name, {}).get("sha256") != meta["sha256"]
+        ]
+
+        for name, meta in manifest["artifacts"].items():
+            src = os.path.join(self.weights_dir, name)
+            # has_object проверяет objects/, поэтому при переходе со старой раскладки
+            # туда попадут и неизменившиеся артефакты
+            if not self.remote.has_object(meta["sha256"]):
+                self.remote.put_object(meta["sha256"], src)
+            if name in changed:
+                copy_atomic(src, self.cache_path(meta["sha256"]), meta["sha256"])
+
+        write_json_atomic(os.path.join(self.weights_dir, MANIFEST), manifest)
+        self.evict({meta["sha256"] for meta in manifest["artifacts"].values()})
+        # старую раскладку переводим на objects/ даже при совпадающих файлах
+        if not changed and remote.get("version") == manifest["version"] and not remote.get("legacy"):
+            return []
+
+        self.remote.write_manifest(manifest)
+        self.remote.prune({meta["sha256"] for meta in manifest["artifacts"].values()})
+        self.remote.commit(message)
+        logger.info(f"Опубликована версия весов {manifest['version']}: {len(changed)} файлов")
+        return changed